@@ -1,13 +1,11 @@
 # app/auth.py
 from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel, validator
-import os, re, time, collections
-from dotenv import load_dotenv
+import re, time, collections
+from .config import settings
 from .supabase_client import supabase, supabase_service, verify_user_token, get_user_github_token, get_authenticated_client, get_free_usage_count
 from .encryption import encrypt_token, decrypt_token
 
-load_dotenv()
-
 # ── Simple in-memory rate limiter ──
 _rate_limit_store: dict[str, list[float]] = collections.defaultdict(list)
 RATE_LIMIT_WINDOW = 60  # seconds
@@ -154,7 +152,7 @@ async def sign_up(request: SignUpRequest, req: Request):
     _check_rate_limit(f"signup:{client_ip}")
     try:
         # Create auth user via Supabase Auth
-        frontend_url = os.getenv("FRONTEND_URL", "http://localhost:5173")
+        frontend_url = settings.frontend_url
         response = supabase.auth.sign_up({
             "email": request.email,
             "password": request.password,
@@ -0,0 +1,35 @@
+# app/config.py
+"""
+Environment configuration, read once at import.
+Every module uses `settings` instead of calling os.getenv on its own.
+"""
+import os
+from dataclasses import dataclass, field
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _env(name: str, default: str | None = None):
+    return field(default_factory=lambda: os.getenv(name, default))
+
+
+@dataclass(frozen=True)
+class Settings:
+    # GitHub defaults — may be empty, per-user token/username used instead
+    github_token: str = _env("GITHUB_TOKEN", "")
+    github_username: str = _env("USERCODE", "")
+    # Server-side AIPIPE token, used for free-trial requests
+    aipipe_token: str | None = _env("AIPIPE_TOKEN")
+    openai_api_key: str | None = _env("OPENAI_API_KEY")
+    # Shared secret for /api-endpoint
+    secret: str | None = _env("SECRET")
+    frontend_url: str = _env("FRONTEND_URL", "http://localhost:5173")
+    supabase_url: str | None = _env("SUPABASE_URL")
+    supabase_anon_key: str | None = _env("SUPABASE_ANON_KEY")
+    supabase_service_key: str | None = _env("SUPABASE_SERVICE_KEY")
+    encryption_key: str | None = _env("ENCRYPTION_KEY")
+    debug: bool = field(default_factory=lambda: bool(os.getenv("DEBUG")))
+
+
+settings = Settings()
@@ -3,13 +3,10 @@
 AES-256 Fernet encryption for sensitive tokens stored in the database.
 Tokens are encrypted before storage and decrypted on retrieval.
 """
-import os
 import base64
 import hashlib
 from cryptography.fernet import Fernet
-from dotenv import load_dotenv
-
-load_dotenv()
+from .config import settings
 
 
 def _get_encryption_key() -> bytes:
@@ -18,10 +15,10 @@ def _get_encryption_key() -> bytes:
     Falls back to SUPABASE_SERVICE_KEY + a salt if ENCRYPTION_KEY is not set.
     The key is derived via SHA-256 so any-length secret works.
     """
-    raw_key = os.getenv("ENCRYPTION_KEY")
+    raw_key = settings.encryption_key
     if not raw_key:
         # Deterministic fallback so existing stored tokens can still be decrypted
-        fallback = os.getenv("SUPABASE_SERVICE_KEY", "default-insecure-key")
+        fallback = settings.supabase_service_key or "default-insecure-key"
         raw_key = f"llm-deploy-enc-{fallback}"
     # SHA-256 → 32 bytes → base64-url-safe = valid Fernet key
     digest = hashlib.sha256(raw_key.encode("utf-8")).digest()
@@ -0,0 +1,67 @@
+# app/github_gql.py
+from gidgethub.httpx import GitHubAPI
+from .github_utils import encode_content
+
+_HEAD_QUERY = """
+query($owner: String!, $name: String!, $ref: String!) {
+  repository(owner: $owner, name: $name) {
+    ref(qualifiedName: $ref) { target { oid } }
+  }
+}
+"""
+
+_COMMIT_MUTATION = """
+mutation($input: CreateCommitOnBranchInput!) {
+  createCommitOnBranch(input: $input) { commit { oid } }
+}
+"""
+
+
+async def get_head_oid(gh: GitHubAPI, full_name: str, branch: str):
+    """Return the HEAD commit oid of `branch`, or None if the branch does not exist yet."""
+    owner, name = full_name.split("/", 1)
+    data = await gh.graphql(_HEAD_QUERY, owner=owner, name=name, ref=f"refs/heads/{branch}")
+    ref = (data.get("repository") or {}).get("ref")
+    return ref["target"]["oid"] if ref else None
+
+
+async def _seed_branch(gh: GitHubAPI, full_name: str, branch: str, path: str, contents_b64: str, message: str) -> str:
+    """
+    createCommitOnBranch cannot create the first commit of an empty repo,
+    so the first file goes through the REST contents API to create the branch.
+    """
+    r = await gh.put(
+        f"/repos/{full_name}/contents/{path}",
+        data={"message": message, "content": contents_b64, "branch": branch},
+    )
+    return r["commit"]["sha"]
+
+
+async def gql_commit(gh: GitHubAPI, full_name: str, branch: str, files: dict, message: str) -> str:
+    """
+    Commit all files to `branch` in a SINGLE commit via createCommitOnBranch.
+
+    files: { "path": str | bytes, ... } — every file is base64-encoded once.
+    Returns the new commit oid.
+    """
+    additions = [{"path": path, "contents": encode_content(content)} for path, content in files.items()]
+    if not additions:
+        raise ValueError("No files to commit")
+
+    head_oid = await get_head_oid(gh, full_name, branch)
+    if head_oid is None:
+        first = additions.pop(0)
+        head_oid = await _seed_branch(gh, full_name, branch, first["path"], first["contents"], message)
+        print(f"🌱 Initialized {branch} on {full_name} with {first['path']}")
+        if not additions:
+            return head_oid
+
+    data = await gh.graphql(_COMMIT_MUTATION, input={
+        "branch": {"repositoryNameWithOwner": full_name, "branchName": branch},
+        "message": {"headline": message},
+        "fileChanges": {"additions": additions},
+        "expectedHeadOid": head_oid,
+    })
+    oid = data["createCommitOnBranch"]["commit"]["oid"]
+    print(f"✅ Committed {len(additions)} files in a single commit to {full_name} ({oid[:7]})")
+    return oid
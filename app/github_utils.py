@@ -1,167 +1,249 @@
 # app/github_utils.py
-import os
-import time
+import random
 import base64
-import requests
-from github import Github
-from github import GithubException, InputGitTreeElement
+import asyncio
+import functools
+import contextlib
+from importlib import resources
 import httpx
-from dotenv import load_dotenv
-from datetime import datetime
+from gidgethub import BadRequest, GitHubBroken, GitHubException, RateLimitExceeded, sansio
+from gidgethub.httpx import GitHubAPI
+from .config import settings
+from datetime import datetime, timezone
 import re
+import time
+
+REQUESTER = "llm-deployment-platform"  # User-Agent sent to GitHub
+MAX_RETRY_WAIT = 90  # Longer waits (e.g. an exhausted hourly quota) fail the call instead
+SECONDARY_LIMIT_WAIT = 60  # GitHub: wait at least a minute when a secondary limit gives no Retry-After
+
+_WS_RE = re.compile(r'[\r\n\t]+')
+_LICENSE_TEMPLATE = resources.files(__package__).joinpath("LICENSE.template").read_text(encoding="utf-8")
+
+
+def create_client() -> httpx.AsyncClient:
+    """
+    Create the shared async client used for all GitHub calls (REST and GraphQL).
+    HTTP/2 multiplexes every call over one connection; auth is per user, see github_api().
+    """
+    return httpx.AsyncClient(http2=True, timeout=httpx.Timeout(30.0))
+
 
-load_dotenv()
+def _resource(url: str) -> str:
+    """GitHub rate-limit resource a request URL counts against."""
+    path = httpx.URL(url).path
+    if path == "/graphql":
+        return "graphql"
+    return "search" if path.startswith("/search/") else "core"
 
-GITHUB_TOKEN = os.getenv("GITHUB_TOKEN", "")  # May be empty, per-user token used instead
-USERNAME = os.getenv("USERCODE", "")  # May be empty, per-user username used instead
 
-# Initialize default client only if token exists
-try:
-    g = Github(GITHUB_TOKEN) if GITHUB_TOKEN else None
-except:
-    g = None
+class BoundedGitHubAPI(GitHubAPI):
+    """
+    GitHubAPI that holds a per-resource semaphore only while a request is in
+    flight, so retry sleeps never keep a shared slot.
+    REST errors also carry the response headers as `e.headers` (gidgethub drops
+    them), so _retry_delay can honor Retry-After.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, *args, limits: dict = None, **kwargs):
+        self._limits = limits or {}
+        super().__init__(client, *args, **kwargs)
+
+    async def _request(self, method, url, headers, body=b""):
+        resource = _resource(url)
+        async with self._limits.get(resource) or contextlib.nullcontext():
+            response = await super()._request(method, url, headers, body)
+        status, response_headers, _ = response
+        # GraphQL errors are raised by gh.graphql() itself
+        if status >= 400 and resource != "graphql":
+            try:
+                sansio.decipher_response(*response)
+            except GitHubException as e:
+                e.headers = response_headers
+                raise
+        return response
 
 
-def create_repo(repo_name: str, description: str = "", github_token: str = None):
+def github_api(client: httpx.AsyncClient, github_token: str = None, limits: dict = None) -> GitHubAPI:
     """
-    Create a public repository with the given name.
+    Wrap the shared client for one user's token.
     If github_token is provided, uses that; otherwise uses default token from .env
+    limits: { "core" | "search" | "graphql": asyncio.Semaphore } bounding in-flight requests
+    """
+    return BoundedGitHubAPI(client, REQUESTER, oauth_token=github_token or settings.github_token, limits=limits)
+
+
+def encode_content(content) -> str:
+    """Base64-encode file content (str as utf-8, bytes as-is) for the GitHub API."""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return base64.b64encode(content).decode("ascii")
+
+
+def _retry_delay(e: Exception, attempt: int, base_delay: float = 1):
+    """
+    Seconds to wait before retrying after `e`, or None if it is not retryable.
+    Rate limits wait for Retry-After, else until X-RateLimit-Reset; secondary
+    limits without either wait at least SECONDARY_LIMIT_WAIT. 5xx and network
+    errors use exponential backoff with jitter. Other 4xx are fatal.
+    """
+    headers = getattr(e, "headers", None) or {}
+    if isinstance(e, RateLimitExceeded):
+        wait = (e.rate_limit.reset_datetime - datetime.now(timezone.utc)).total_seconds()
+    elif isinstance(e, (GitHubBroken, httpx.TransportError)):
+        wait = 0
+    elif isinstance(e, BadRequest) and (
+        e.status_code == 429 or (e.status_code == 403 and "rate limit" in str(e).lower())
+    ):
+        if "retry-after" in headers:
+            wait = float(headers["retry-after"])
+        elif headers.get("x-ratelimit-remaining") == "0":
+            wait = int(headers.get("x-ratelimit-reset", 0)) - time.time()
+        else:
+            wait = SECONDARY_LIMIT_WAIT
+    else:
+        return None
+    if wait <= 0:
+        wait = base_delay * 2 ** attempt
+    return wait + random.random()
+
+
+def with_gh_retry(max_attempts: int = 5):
+    """
+    Retry a GitHub call on rate limits (403/429), 5xx and network errors; other 4xx are raised immediately.
+    A wait over MAX_RETRY_WAIT is raised too, rather than stalling the job for up to an hour.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            for attempt in range(max_attempts):
+                try:
+                    return await func(*args, **kwargs)
+                except (GitHubException, httpx.TransportError) as e:
+                    wait = _retry_delay(e, attempt)
+                    if wait is None or wait > MAX_RETRY_WAIT or attempt == max_attempts - 1:
+                        raise
+                    print(f"⏳ {func.__name__} failed ({e!r}), retrying in {wait:.1f}s (attempt {attempt+1}/{max_attempts})")
+                    await asyncio.sleep(wait)
+        return wrapper
+    return decorator
+
+
+@with_gh_retry()
+async def create_repo(gh: GitHubAPI, repo_name: str, description: str = "") -> dict:
+    """
+    Create a public repository with the given name for the authenticated user.
+    Returns the repo as a dict (full_name, html_url, default_branch, ...).
     """
-    token = github_token or GITHUB_TOKEN
-    g_client = Github(token)
-    user = g_client.get_user()
-    
+    # The token's own login, not the username typed in Settings, which may differ
+    owner = (await gh.getitem("/user"))["login"]
+
     # if repo exists, return it
     try:
-        repo = user.get_repo(repo_name)
-        print("Repo already exists:", repo.full_name)
+        repo = await gh.getitem(f"/repos/{owner}/{repo_name}")
+        print("Repo already exists:", repo["full_name"])
         return repo
-    except GithubException:
-        pass
-    safe_description = re.sub(r'[\r\n\t]+', ' ', description)[:300]
-    repo = user.create_repo(
-        name=repo_name,
-        description=f"{safe_description} (see README for full brief)",
-        private=False,
-        auto_init=False
-    )
-    print("Created repo:", repo.full_name)
+    except BadRequest as e:
+        if e.status_code != 404:
+            raise
+    safe_description = _WS_RE.sub(' ', description)[:300]
+    repo = await gh.post("/user/repos", data={
+        "name": repo_name,
+        "description": f"{safe_description} (see README for full brief)",
+        "private": False,
+        "auto_init": False,
+    })
+    print("Created repo:", repo["full_name"])
     return repo
 
-def create_or_update_file(repo, path: str, content: str, message: str):
+
+async def get_file_text(gh: GitHubAPI, full_name: str, path: str) -> str:
+    """Fetch a file from the default branch and decode it as utf-8."""
+    item = await gh.getitem(f"/repos/{full_name}/contents/{path}")
+    return base64.b64decode(item["content"]).decode("utf-8", errors="ignore")
+
+
+@with_gh_retry()
+async def create_or_update_file(gh: GitHubAPI, full_name: str, path: str, content, message: str, mode: str = "auto"):
     """
-    Create a file or update if it already exists.
+    Create a file or update if it already exists. content may be str or bytes.
+    mode: "auto" tries create first and updates on 422 (file exists) — one call for new files,
+          "update" looks up the sha first — one call saved when the file usually exists,
+          "create" only creates and raises if the file exists.
     """
+    url = f"/repos/{full_name}/contents/{path}"
+    data = {"message": message, "content": encode_content(content)}
+    if mode != "update":
+        try:
+            await gh.put(url, data=data)
+            print(f"Created {path} in {full_name}")
+            return
+        except BadRequest as e:
+            # 422 = file already exists (no sha supplied)
+            if e.status_code != 422 or mode == "create":
+                raise
     try:
-        # Try to get file to see if exists
-        current = repo.get_contents(path)
-        sha = current.sha
-        repo.update_file(path, message, content, sha)
-        print(f"Updated {path} in {repo.full_name}")
-    except GithubException as e:
+        current = await gh.getitem(url)
+        await gh.put(url, data={**data, "sha": current["sha"]})
+        print(f"Updated {path} in {full_name}")
+    except BadRequest as e:
         # If 404 (not found) then create
-        if e.status == 404:
-            repo.create_file(path, message, content)
-            print(f"Created {path} in {repo.full_name}")
+        if e.status_code == 404:
+            await gh.put(url, data=data)
+            print(f"Created {path} in {full_name}")
         else:
             # some other error
             raise
 
 
-def create_or_update_binary_file(repo, path: str, binary_content, commit_message: str):
-    """
-    Create or update a binary file in the repository.
-    This function handles binary data like images directly without encoding/decoding.
-    """
-    try:
-        # Try to get file to see if exists
-        try:
-            current = repo.get_contents(path)
-            # Update existing file
-            repo.update_file(
-                path=path,
-                message=commit_message,
-                content=binary_content,
-                sha=current.sha
-            )
-            print(f"Updated binary file {path} in {repo.full_name}")
-        except GithubException as e:
-            # If file doesn't exist, create it
-            if e.status == 404:
-                repo.create_file(
-                    path=path,
-                    message=commit_message,
-                    content=binary_content
-                )
-                print(f"Created binary file {path} in {repo.full_name}")
-            else:
-                # some other error
-                raise
-        return True
-    except Exception as e:
-        print(f"Error creating/updating binary file {path}: {e}")
-        return False
+@with_gh_retry()
+async def create_blob(gh: GitHubAPI, full_name: str, content) -> str:
+    """Upload one file as a git blob and return its sha."""
+    blob = await gh.post(f"/repos/{full_name}/git/blobs", data={
+        "content": encode_content(content),
+        "encoding": "base64",
+    })
+    return blob["sha"]
 
-def batch_commit_files(repo, file_dict: dict, commit_message: str = "Update project files"):
+
+async def commit_blobs(gh: GitHubAPI, full_name: str, branch: str, blob_shas: dict, commit_message: str) -> str:
     """
-    Commit multiple files in a single commit using Git Tree API.
-    This triggers only ONE GitHub Actions workflow instead of one per file.
-    
-    file_dict: { "path": "content_string", ... }
+    Point `branch` at a new commit containing the given blobs.
+
+    blob_shas: { "path": "blob_sha", ... }
+    Returns the new commit SHA.
     """
-    try:
-        # Get the latest commit SHA on the default branch
-        default_branch = repo.default_branch or "main"
-        ref = repo.get_git_ref(f"heads/{default_branch}")
-        latest_sha = ref.object.sha
-        base_tree = repo.get_git_tree(latest_sha)
-
-        # Build tree elements for all files
-        tree_elements = []
-        for path, content in file_dict.items():
-            blob = repo.create_git_blob(content, "utf-8")
-            tree_elements.append(InputGitTreeElement(
-                path=path,
-                mode="100644",
-                type="blob",
-                sha=blob.sha
-            ))
-
-        # Create the new tree and commit
-        new_tree = repo.create_git_tree(tree_elements, base_tree)
-        new_commit = repo.create_git_commit(commit_message, new_tree, [repo.get_git_commit(latest_sha)])
-        ref.edit(new_commit.sha)
-
-        print(f"✅ Batch committed {len(file_dict)} files in a single commit to {repo.full_name}")
-        return True
-    except Exception as e:
-        print(f"⚠ Batch commit failed: {e}")
-        print("  Falling back to individual commits...")
-        # Fallback: commit files individually
-        for path, content in file_dict.items():
-            try:
-                create_or_update_file(repo, path, content, f"Add/Update {path}")
-            except Exception as e2:
-                print(f"  ⚠ Failed to commit {path}: {e2}")
-        return False
+    # Get the latest commit on the branch
+    ref = await gh.getitem(f"/repos/{full_name}/git/ref/heads/{branch}")
+    latest_sha = ref["object"]["sha"]
+    latest = await gh.getitem(f"/repos/{full_name}/git/commits/{latest_sha}")
 
+    # Create the new tree and commit
+    tree = await gh.post(f"/repos/{full_name}/git/trees", data={
+        "base_tree": latest["tree"]["sha"],
+        "tree": [
+            {"path": path, "mode": "100644", "type": "blob", "sha": sha}
+            for path, sha in blob_shas.items()
+        ],
+    })
+    new_commit = await gh.post(f"/repos/{full_name}/git/commits", data={
+        "message": commit_message,
+        "tree": tree["sha"],
+        "parents": [latest_sha],
+    })
+    await gh.patch(f"/repos/{full_name}/git/refs/heads/{branch}", data={"sha": new_commit["sha"]})
+    return new_commit["sha"]
 
 
+async def get_branch_sha(gh: GitHubAPI, full_name: str, branch: str) -> str:
+    """HEAD commit SHA of `branch` in one call."""
+    return (await gh.getitem(f"/repos/{full_name}/branches/{branch}"))["commit"]["sha"]
 
-def enable_pages(repo_name: str, branch: str = "main", github_token: str = None, github_username: str = None, retries: int = 3, delay: int = 2):
+
+async def enable_pages(gh: GitHubAPI, full_name: str, branch: str = "main", retries: int = 3, delay: int = 2):
     """
     Enable GitHub Pages via the REST API.
-    If github_token is provided, uses that; otherwise uses default from .env
     """
-    token = github_token or os.getenv("GITHUB_TOKEN")
-    username = github_username or os.getenv("USERCODE")
-    url = f"https://api.github.com/repos/{username}/{repo_name}/pages"
-
-    headers = {
-        "Authorization": f"token {token}",
-        "Accept": "application/vnd.github.v3+json"
-    }
-
     payload = {
         "source": {
             "branch": branch,
@@ -170,27 +252,30 @@ def enable_pages(repo_name: str, branch: str = "main", github_token: str = None,
     }
 
     for attempt in range(retries):
-        response = requests.post(url, json=payload, headers=headers)
-        if response.status_code in (201, 202):  # Created / Accepted
+        try:
+            await gh.post(f"/repos/{full_name}/pages", data=payload)  # Created / Accepted
             print("✅ GitHub Pages enabled!")
             return True
-        elif response.status_code in (409, 422):  # 409 = conflict (already enabled), 422 = unprocessable (already exists)
-            print("⚠ Pages already enabled.")
-            return True
-        else:
-            print(f"Pages API attempt {attempt+1} failed:", response.status_code, response.text)
-            time.sleep(delay)
+        except BadRequest as e:
+            if e.status_code in (409, 422):  # 409 = conflict (already enabled), 422 = unprocessable (already exists)
+                print("⚠ Pages already enabled.")
+                return True
+            print(f"Pages API attempt {attempt+1} failed:", e.status_code, e)
+            wait = _retry_delay(e, attempt, delay)
+        except (GitHubException, httpx.TransportError) as e:
+            print(f"Pages API attempt {attempt+1} failed:", e)
+            wait = _retry_delay(e, attempt, delay)
+        if wait is None or wait > MAX_RETRY_WAIT:
+            break
+        if attempt < retries - 1:
+            await asyncio.sleep(wait)
 
     print("⚠ Could not verify Pages status, but URL should work if repo exists.")
     return True  # Return True anyway since Pages is likely already enabled
 
-def generate_mit_license(owner_name=None):
-    year = datetime.utcnow().year
-    owner = owner_name or USERNAME or "Owner"
-    return f"""MIT License
-
-Copyright (c) {year} {owner}
+@functools.lru_cache(maxsize=8)
+def _build_license(year: int, owner: str) -> str:
+    return _LICENSE_TEMPLATE.format(year=year, owner=owner)
 
-Permission is hereby granted, free of charge, to any person obtaining a copy...
-[Full MIT license text omitted here for brevity — replace in production with full license text]
-"""
+def generate_mit_license(owner_name=None):
+    return _build_license(datetime.utcnow().year, owner_name or settings.github_username or "Owner")
@@ -1,52 +1,180 @@
 import os
-import base64
+import uuid
+import hashlib
+import time
+import binascii
+import functools
+import httpx
 import mimetypes
 import re
 from pathlib import Path
 from datetime import datetime
-from dotenv import load_dotenv
+from .config import settings
 from openai import OpenAI
 
-load_dotenv()
-
-# Lazy-initialized OpenAI client — created on first use
-# This prevents crashes when AIPIPE_TOKEN env var is not set
-_default_client = None
-
-def _get_default_client():
-    """Get or create the default OpenAI client using server's AIPIPE_TOKEN."""
-    global _default_client
-    token = os.getenv("AIPIPE_TOKEN")
-    if not token:
-        return None
-    if _default_client is None:
-        _default_client = OpenAI(
-            api_key=token,
-            base_url="https://aipipe.org/openai/v1"
-        )
-    return _default_client
+AIPIPE_BASE_URL = "https://aipipe.org/openai/v1"
+
+
+@functools.lru_cache(maxsize=1)
+def _get_http_client() -> httpx.Client:
+    """
+    Pooled HTTP/2 client shared by every OpenAI client, so repeated LLM calls
+    reuse connections instead of paying a TLS handshake each time.
+    """
+    return httpx.Client(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+        # Reasoning models can stay silent for minutes before the first streamed token
+        timeout=httpx.Timeout(60.0, read=600.0),
+    )
+
+
+@functools.lru_cache(maxsize=32)
+def get_llm_client(api_key: str) -> OpenAI:
+    """
+    Get or create the OpenAI (aiPipe) client for a token — created on first use.
+    Cached per token; call get_llm_client.cache_clear() to swap clients in tests.
+    """
+    return OpenAI(api_key=api_key, base_url=AIPIPE_BASE_URL, http_client=_get_http_client())
 
 TMP_DIR = Path("/tmp/llm_attachments")
 TMP_DIR.mkdir(parents=True, exist_ok=True)
 
+_EXPECTED_FILE_RE = re.compile(r'[\w\-]+\.(?:txt|json|md|svg|html|csv)')
+
+_B64_CHUNK = 64 * 1024  # Multiple of 4 so slices decode independently
+_B64_WS = str.maketrans("", "", " \t\r\n")
+INLINE_MAX = 1024 * 1024  # Attachments up to this size keep their bytes in memory
+TMP_MAX_AGE = 24 * 3600  # Seconds an unused attachment file is kept for reuse
+
 
 # ==========================================================
 # Decode and handle attachments
 # ==========================================================
-def decode_attachments(attachments):
+def _b64_slices(b64data: str, start: int = 0):
+    """Yield decoded bytes for b64data[start:] in 64KB slices."""
+    carry = ""
+    for i in range(start, len(b64data), _B64_CHUNK):
+        chunk = carry + b64data[i:i + _B64_CHUNK].translate(_B64_WS)
+        cut = len(chunk) - len(chunk) % 4
+        carry = chunk[cut:]
+        yield binascii.a2b_base64(chunk[:cut])
+    if carry:
+        yield binascii.a2b_base64(carry)  # Raises on truncated input
+
+
+def _write_b64(path, b64data: str, start: int = 0, keep_max: int = 0):
+    """
+    Decode b64data[start:] into path slice by slice, so the decoded bytes
+    are never held in memory all at once.
+    Returns (size, data): data is the decoded bytes if size <= keep_max, else None.
+    """
+    size = 0
+    parts = [] if keep_max else None
+    with open(path, "wb") as f:
+        for data in _b64_slices(b64data, start):
+            f.write(data)
+            size += len(data)
+            if parts is not None:
+                if size <= keep_max:
+                    parts.append(data)
+                else:
+                    parts = None
+    return size, (b"".join(parts) if parts is not None else None)
+
+
+def _b64_digest(b64data: str, start: int = 0) -> str:
+    """Short sha256 of the base64 payload, hashed slice by slice."""
+    h = hashlib.sha256()
+    for i in range(start, len(b64data), _B64_CHUNK):
+        h.update(b64data[i:i + _B64_CHUNK].encode("ascii", "ignore"))
+    return h.hexdigest()[:16]
+
+
+def _b64_size(b64data: str, start: int = 0) -> int:
+    """Decoded size of b64data[start:], assuming no embedded whitespace."""
+    n = len(b64data) - start
+    pad = b64data.endswith("=") + b64data.endswith("==") if n else 0
+    return n * 3 // 4 - pad
+
+
+def _atomic_write(path: Path, write):
+    """Run write(tmp_path) then rename into place, so readers never see a partial file."""
+    tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex[:8]}.partial")
+    try:
+        result = write(tmp)
+        os.replace(tmp, path)
+        return result
+    except Exception:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def _store_b64(name: str, b64data: str, start: int = 0, keep_max: int = 0):
+    """
+    Decode into a content-addressed file, TMP_DIR/<digest>_<name>.
+    An identical payload decoded earlier (e.g. resent in round 2) is reused as-is.
+    Returns (path, size, data) like _write_b64.
+    """
+    path = TMP_DIR / f"{_b64_digest(b64data, start)}_{name}"
+    expected = _b64_size(b64data, start)
+    try:
+        if path.stat().st_size == expected:
+            os.utime(path)  # Reused files stay young for sweep_attachments
+            return path, expected, (path.read_bytes() if expected <= keep_max else None)
+    except FileNotFoundError:
+        pass  # Not stored yet, or swept in between
+    size, data = _atomic_write(path, lambda tmp: _write_b64(tmp, b64data, start, keep_max))
+    return path, size, data
+
+
+def _store_bytes(name: str, data: bytes) -> Path:
+    """Content-addressed write for already-decoded data."""
+    path = TMP_DIR / f"{hashlib.sha256(data).hexdigest()[:16]}_{name}"
+    try:
+        if path.stat().st_size == len(data):
+            os.utime(path)
+            return path
+    except FileNotFoundError:
+        pass
+    _atomic_write(path, lambda tmp: tmp.write_bytes(data))
+    return path
+
+
+def sweep_attachments(max_age: float = TMP_MAX_AGE) -> int:
+    """
+    Delete attachment files not written or reused for max_age seconds.
+    Content-addressed names never overwrite each other, so TMP_DIR only shrinks here.
+    Returns the number of files removed.
+    """
+    cutoff = time.time() - max_age
+    removed = 0
+    for entry in os.scandir(TMP_DIR):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def decode_attachments(attachments, stream=False):
     """
     attachments: list of dicts, each with either:
         - 'url': "data:<mime>;base64,<b64data>"
         - OR 'content': direct string content
       and 'name' and optional 'mime'
     
-    Saves files into /tmp/llm_attachments/<name>
-    Returns list of dicts: {"name": name, "path": "/tmp/..", "mime": mime, "size": n}
+    Saves files into /tmp/llm_attachments/<digest>_<name>, reusing identical earlier files
+    Returns list of dicts: {"name": name, "path": "/tmp/..", "mime": mime, "size": n, "bytes": data}
+    "bytes" is None for files over INLINE_MAX, or for all files if stream=True;
+    callers then read from "path".
     """
+    keep_max = 0 if stream else INLINE_MAX
     saved = []
     for att in attachments or []:
         name = att.get("name") or "attachment"
-        path = TMP_DIR / name
 
         try:
             if "content" in att:
@@ -54,21 +182,22 @@ def decode_attachments(attachments):
                 mime = att.get("mime", "text/plain")
                 if mime.startswith("text"):
                     data = content.encode("utf-8")
+                    path = _store_bytes(name, data)
+                    size = len(data)
+                    if size > keep_max:
+                        data = None
                 else:
-                    data = base64.b64decode(content)
-                with open(path, "wb") as f:
-                    f.write(data)
-                saved.append({"name": name, "path": str(path), "mime": mime, "size": len(data)})
+                    path, size, data = _store_b64(name, content, keep_max=keep_max)
+                saved.append({"name": name, "path": str(path), "mime": mime, "size": size, "bytes": data})
                 continue
 
             url = att.get("url", "")
             if url.startswith("data:"):
-                header, b64data = url.split(",", 1)
-                mime = header.split(";")[0].replace("data:", "")
-                data = base64.b64decode(b64data)
-                with open(path, "wb") as f:
-                    f.write(data)
-                saved.append({"name": name, "path": str(path), "mime": mime, "size": len(data)})
+                # Find the header/payload split without copying the payload
+                comma = url.index(",")
+                mime = url[:comma].split(";")[0].replace("data:", "")
+                path, size, data = _store_b64(name, url, comma + 1, keep_max=keep_max)
+                saved.append({"name": name, "path": str(path), "mime": mime, "size": size, "bytes": data})
 
         except Exception as e:
             print("Failed to decode/save attachment", name, e)
@@ -76,6 +205,17 @@ def decode_attachments(attachments):
     return saved
 
 
+def _read_head(s, n: int = 1000) -> bytes:
+    """First n bytes of a saved attachment, from memory if available."""
+    if s.get("bytes") is not None:
+        return s["bytes"][:n]
+    fd = os.open(s["path"], os.O_RDONLY)
+    try:
+        return os.pread(fd, n, 0)
+    finally:
+        os.close(fd)
+
+
 def summarize_attachment_meta(saved):
     """
     saved is list from decode_attachments.
@@ -84,17 +224,16 @@ def summarize_attachment_meta(saved):
     summaries = []
     for s in saved:
         nm = s["name"]
-        p = s["path"]
         mime = s.get("mime", "")
         try:
             if mime.startswith("text") or nm.endswith((".md", ".txt", ".json", ".csv")):
-                with open(p, "r", encoding="utf-8", errors="ignore") as f:
-                    if nm.endswith(".csv"):
-                        lines = [next(f).strip() for _ in range(3)]
-                        preview = "\\n".join(lines)
-                    else:
-                        data = f.read(1000)
-                        preview = data.replace("\n", "\\n")[:1000]
+                head = _read_head(s)
+                if nm.endswith(".csv"):
+                    lines = [ln.decode("utf-8", "ignore").strip() for ln in head.split(b"\n", 3)[:3]]
+                    preview = "\\n".join(lines)
+                else:
+                    data = head.decode("utf-8", "ignore")
+                    preview = data.replace("\n", "\\n")[:1000]
                 summaries.append(f"- {nm} ({mime}): preview: {preview}")
             else:
                 summaries.append(f"- {nm} ({mime}): {s['size']} bytes")
@@ -112,6 +251,72 @@ def _strip_code_block(text: str) -> str:
     return text.strip()
 
 
+class _FileBlockParser:
+    """
+    Incrementally split model output into files as it streams in.
+
+    A block runs from '>>> filename: <name>' to the next '\\n---END FILE---'
+    (or the end of output). Only the unparsed tail is buffered, and each
+    search resumes where the previous one stopped.
+    """
+    START = b">>> filename:"
+    END = b"\n---END FILE---"
+
+    def __init__(self):
+        self.files = {}
+        self._parts = []  # Full text, for the legacy fallback
+        self._buf = bytearray()
+        self._scan = 0
+        self._name = None  # Filename of the open block
+
+    def feed(self, delta: str) -> list:
+        """Add streamed text; returns the names of files completed by it."""
+        self._parts.append(delta)
+        self._buf += delta.encode("utf-8")
+        done = []
+        while True:
+            if self._name is None:
+                i = self._buf.find(self.START, self._scan)
+                if i < 0:
+                    self._scan = max(0, len(self._buf) - len(self.START) + 1)
+                    break
+                j = i + len(self.START)
+                while j < len(self._buf) and self._buf[j] in b" \t\r\n":
+                    j += 1
+                nl = self._buf.find(b"\n", j)
+                if nl < 0:
+                    self._scan = i
+                    break
+                self._name = self._buf[j:nl].decode("utf-8", "ignore").strip()
+                del self._buf[:nl + 1]
+                self._scan = 0
+            else:
+                k = self._buf.find(self.END, self._scan)
+                if k < 0:
+                    self._scan = max(0, len(self._buf) - len(self.END) + 1)
+                    break
+                done.append(self._name)
+                self._finish(k)
+                del self._buf[:k + len(self.END)]
+                self._scan = 0
+        return done
+
+    def _finish(self, end: int):
+        content = self._buf[:end].decode("utf-8", "ignore")
+        self.files[self._name] = _strip_code_block(content.strip())
+        self._name = None
+
+    def close(self) -> dict:
+        """Flush a final block with no END marker and return all parsed files."""
+        if self._name is not None:
+            self._finish(len(self._buf))
+        return self.files
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+
 def generate_readme_fallback(brief: str, checks=None, attachments_meta=None, round_num=1):
     """Fallback README in case LLM fails."""
     checks_text = "\\n".join(checks or [])
@@ -138,17 +343,19 @@ This README was generated as a fallback (OpenAI did not return an explicit READM
 # ==========================================================
 # Enhanced multi-file generator
 # ==========================================================
-def generate_app_code(brief: str, attachments=None, checks=None, round_num=1, prev_readme=None, aipipe_token=None):
+def generate_app_code(brief: str, attachments=None, checks=None, round_num=1, prev_readme=None, aipipe_token=None, saved=None):
     """
     Generate or revise a multi-file app using the OpenAI Responses API.
     Automatically detects filenames from the brief and parses multiple files from model output.
     Uses per-user aipipe_token if provided, otherwise falls back to env var.
+    saved: attachments already run through decode_attachments; attachments is ignored if given.
     """
-    saved = decode_attachments(attachments or [])
+    if saved is None:
+        saved = decode_attachments(attachments or [])
     attachments_meta = summarize_attachment_meta(saved)
 
     # Detect expected filenames from the brief
-    expected_files = re.findall(r'[\w\-]+\.(?:txt|json|md|svg|html|csv)', brief)
+    expected_files = _EXPECTED_FILE_RE.findall(brief)
     if not expected_files:
         expected_files = ["index.html", "README.md"]
     expected_list = "\n".join(f"- {f}" for f in expected_files)
@@ -193,27 +400,28 @@ The brief mentions or implies these files:
 
     # Call OpenAI (aiPipe) — use per-user token if available, fall back to server token
     try:
-        if aipipe_token:
-            llm_client = OpenAI(
-                api_key=aipipe_token,
-                base_url="https://aipipe.org/openai/v1"
-            )
-        else:
-            llm_client = _get_default_client()
-            if llm_client is None:
-                raise RuntimeError("No AIPIPE token available. Please add your own AIPIPE token in Settings.")
-        response = llm_client.responses.create(
+        token = aipipe_token or settings.aipipe_token
+        if not token:
+            raise RuntimeError("No AIPIPE token available. Please add your own AIPIPE token in Settings.")
+        llm_client = get_llm_client(token)
+        # Stream so files are split out as they arrive instead of after the whole response
+        parser = _FileBlockParser()
+        with llm_client.responses.stream(
             model="gpt-5",
             input=[
                 {"role": "system", "content": "You are a helpful coding assistant that generates structured multi-file projects."},
                 {"role": "user", "content": user_prompt}
             ]
-        )
-        text = response.output_text or ""
+        ) as stream:
+            for event in stream:
+                if event.type == "response.output_text.delta":
+                    for fname in parser.feed(event.delta):
+                        print(f"📄 Received {fname}")
         print("✅ Generated multi-file project via aiPipe/OpenAI.")
     except Exception as e:
         print("⚠ OpenAI API failed, using fallback minimal files:", e)
-        text = f"""
+        parser = _FileBlockParser()
+        parser.feed(f"""
 >>> filename: index.html
 <html><body><h1>Fallback App</h1><p>{brief}</p></body></html>
 ---END FILE---
@@ -221,18 +429,12 @@ The brief mentions or implies these files:
 # Auto-generated README
 This fallback was generated due to API error.
 ---END FILE---
-"""
+""")
 
-    # Parse multi-file format
-    files = {}
-    pattern = re.compile(r">>> filename:\s*(.+?)\n(.*?)(?=\n---END FILE---|$)", re.S)
-    matches = pattern.findall(text)
-    if matches:
-        for fname, content in matches:
-            fname = fname.strip()
-            content = _strip_code_block(content.strip())
-            files[fname] = content
-    else:
+    # Multi-file format, parsed while streaming
+    files = parser.close()
+    text = parser.text
+    if not files:
         # Legacy fallback
         if "---README.md---" in text:
             code_part, readme_part = text.split("---README.md---", 1)
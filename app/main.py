@@ -1,18 +1,27 @@
-from fastapi import FastAPI, Request, BackgroundTasks, Depends, HTTPException
-import os, json, base64, uuid, re
-from dotenv import load_dotenv
+from fastapi import FastAPI, Request, Depends, HTTPException
+import os, uuid, re, asyncio
+import orjson
+from pathlib import Path
+from contextlib import asynccontextmanager
+from .config import settings
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from .llm_generator import generate_app_code, decode_attachments
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel
+from .llm_generator import generate_app_code, decode_attachments, sweep_attachments
 from .github_utils import (
+    create_client as create_gh_client,
+    github_api,
     create_repo,
+    get_file_text,
     create_or_update_file,
     enable_pages,
     generate_mit_license,
-    batch_commit_files,
+    create_blob,
+    commit_blobs,
+    get_branch_sha,
 )
+from .github_gql import gql_commit
 from .notify import notify_evaluation_server
-from .github_utils import create_or_update_binary_file
 from .auth import router as auth_router, get_current_user
 from .supabase_client import (
     save_project,
@@ -27,23 +36,80 @@ from .supabase_client import (
 from fastapi.routing import APIRoute
 import time
 
-load_dotenv()
-USER_SECRET = os.getenv("SECRET")
-USERNAME = os.getenv("USERCODE")
-FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")  # Configurable frontend URL
 PROCESSED_PATH = "/tmp/processed_requests.json"
+FLUSH_INTERVAL = 1.0  # Seconds to batch processed-request writes before one snapshot
+_SLUG_STRIP_RE = re.compile(r'[^a-zA-Z0-9\s]')
+NUM_WORKERS = 8  # Background job consumers
+SWEEP_INTERVAL = 3600  # Seconds between sweeps of stale attachment files
+GH_CONCURRENCY = 10  # Max in-flight GitHub requests per resource type (secondary rate limits)
 
 # Store for tracking project status (temporary - can use Supabase for persistence)
 project_status = {}
 
-app = FastAPI(title="LLM Deployment Platform", version="2.0.0")
+async def _job_worker(queue: asyncio.Queue):
+    """Consume (handler, args) jobs from the queue one at a time."""
+    while True:
+        handler, args = await queue.get()
+        try:
+            await handler(*args)
+        except Exception as e:
+            print(f"❌ Background job {handler.__name__} failed: {e}")
+            import traceback
+            traceback.print_exc()
+        finally:
+            queue.task_done()
+
+async def _attachment_sweeper():
+    """Periodically delete attachment files that no job has used recently."""
+    while True:
+        try:
+            removed = await asyncio.to_thread(sweep_attachments)
+            if removed:
+                print(f"🧹 Removed {removed} stale attachment files")
+        except Exception as e:
+            print(f"⚠ Attachment sweep failed: {e}")
+        await asyncio.sleep(SWEEP_INTERVAL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One persistent HTTP/2 client for all GitHub calls (REST and GraphQL)
+    app.state.gh_client = create_gh_client()
+    # Separate budgets per GitHub resource type, like the API's own rate limits
+    app.state.gh_sem = {
+        "core": asyncio.Semaphore(GH_CONCURRENCY),
+        "search": asyncio.Semaphore(GH_CONCURRENCY),
+        "graphql": asyncio.Semaphore(GH_CONCURRENCY),
+    }
+    # Processed requests live in memory; disk is only touched on writes
+    app.state.processed = load_processed()
+    app.state.processed_lock = asyncio.Lock()
+    app.state.processed_writes = asyncio.Queue()
+    writer = asyncio.create_task(_processed_writer(app.state.processed_writes))
+    app.state.job_queue = asyncio.Queue()
+    workers = [asyncio.create_task(_job_worker(app.state.job_queue)) for _ in range(NUM_WORKERS)]
+    sweeper = asyncio.create_task(_attachment_sweeper())
+    yield
+    for w in workers + [sweeper]:
+        w.cancel()
+    await asyncio.gather(*workers, sweeper, return_exceptions=True)
+    # Let the writer finish its in-flight snapshot and write the final one
+    await app.state.processed_writes.put(None)
+    await writer
+    await app.state.gh_client.aclose()
+
+app = FastAPI(
+    title="LLM Deployment Platform",
+    version="2.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # Include auth routes
 app.include_router(auth_router)
 
 # Enable CORS — restrict to known origins
 _allowed_origins = [
-    FRONTEND_URL,  # Production Vercel URL from env var
+    settings.frontend_url,  # Production Vercel URL from env var
     "https://madme.vercel.app",  # Production Vercel deployment
     "http://localhost:5173",  # Local dev
     "http://localhost:5174",
@@ -75,32 +141,99 @@ async def add_security_headers(request: Request, call_next):
 
 print("✅ Backend loaded - Multi-user platform with Supabase")
 
+# === Request models ===
+class Attachment(BaseModel):
+    name: str = "attachment"
+    url: str | None = None  # "data:<mime>;base64,<b64data>"
+    content: str | None = None
+    mime: str | None = None
+
+class TaskRequest(BaseModel):
+    email: str
+    task: str
+    round: int = 1
+    nonce: str
+    brief: str
+    secret: str | None = None
+    evaluation_url: str | None = None
+    attachments: list[Attachment] = []
+    checks: list[str] = []
+    # Per-user fields, set by /deploy
+    user_id: str | None = None
+    github_token: str | None = None
+    github_username: str | None = None
+    aipipe_token: str | None = None  # None = server fallback inside generator
+    access_token: str | None = None
+    using_free_trial: bool = False
+
+    @property
+    def key(self) -> str:
+        """Duplicate-detection key for processed requests."""
+        return f"{self.email}::{self.task}::round{self.round}::nonce{self.nonce}"
+
 # === Persistence for processed requests ===
 def load_processed():
+    """Load the snapshot (called once at startup)."""
     if os.path.exists(PROCESSED_PATH):
         try:
-            return json.load(open(PROCESSED_PATH))
-        except json.JSONDecodeError:
+            return orjson.loads(Path(PROCESSED_PATH).read_bytes())
+        except orjson.JSONDecodeError:
             return {}
     return {}
 
-def save_processed(data):
-    json.dump(data, open(PROCESSED_PATH, "w"), indent=2)
+def _write_snapshot(snapshot: bytes):
+    """Atomically replace the snapshot file, so a crash never leaves it torn."""
+    tmp = f"{PROCESSED_PATH}.{uuid.uuid4().hex[:8]}.partial"
+    Path(tmp).write_bytes(snapshot)
+    os.replace(tmp, PROCESSED_PATH)
+
+async def _flush_processed():
+    async with app.state.processed_lock:
+        snapshot = orjson.dumps(app.state.processed, option=orjson.OPT_INDENT_2)
+    await asyncio.to_thread(_write_snapshot, snapshot)
+
+async def _processed_writer(queue: asyncio.Queue):
+    """
+    Write-behind: fold every update queued within FLUSH_INTERVAL into one snapshot.
+    A None on the queue writes a last snapshot right away and stops the writer.
+    """
+    stop = False
+    while not stop:
+        stop = await queue.get() is None
+        if not stop:
+            await asyncio.sleep(FLUSH_INTERVAL)
+        while not queue.empty():
+            stop = queue.get_nowait() is None or stop
+        try:
+            await _flush_processed()
+        except Exception as e:
+            print(f"⚠ Failed to persist processed requests: {e}")
+
+async def get_processed(key: str):
+    """Return the stored payload for key, or None."""
+    async with app.state.processed_lock:
+        return app.state.processed.get(key)
+
+async def save_processed(key: str, payload: dict):
+    """Record one processed request in memory; disk is written behind by _processed_writer."""
+    async with app.state.processed_lock:
+        app.state.processed[key] = payload
+    await app.state.processed_writes.put(key)
 
-def process_request_with_logging(task_id: str, data: dict):
+async def process_request_with_logging(task_id: str, req: TaskRequest):
     """Wrapper around process_request to update status"""
-    user_id = data.get("user_id")
+    user_id = req.user_id
     try:
         print(f"\n{'='*60}")
         print(f"📝 Processing task: {task_id}")
-        print(f"👤 User: {data.get('github_username')}")
-        print(f"📄 Brief: {data['brief'][:60]}...")
+        print(f"👤 User: {req.github_username}")
+        print(f"📄 Brief: {req.brief[:60]}...")
         print(f"{'='*60}\n")
         
         project_status[task_id]["status"] = "generating_code"
         
         # Call the main process function and get results
-        result = process_request(data)
+        result = await process_request(req)
         
         # Update status in both memory and Supabase
         if result:
@@ -114,22 +247,20 @@ def process_request_with_logging(task_id: str, data: dict):
         project_status[task_id]["status"] = "completed"
         
         # Record free trial usage only after successful completion
-        if data.get("using_free_trial") and user_id:
-            import asyncio
-            asyncio.run(record_free_usage(user_id, task_id))
+        if req.using_free_trial and user_id:
+            await record_free_usage(user_id, task_id)
             print(f"   🎁 Free trial request recorded for user {user_id}")
         
         # Update Supabase
         if user_id:
-            import asyncio
-            asyncio.run(update_project_status(
+            await update_project_status(
                 user_id=user_id,
                 task_id=task_id,
                 status="completed",
                 github_url=project_status[task_id].get("github_url"),
                 pages_url=project_status[task_id].get("pages_url"),
-                access_token=data.get("access_token")
-            ))
+                access_token=req.access_token
+            )
         
         print(f"\n✅ Task {task_id} completed successfully!\n")
         
@@ -142,97 +273,157 @@ def process_request_with_logging(task_id: str, data: dict):
         
         # Update Supabase with error
         if user_id:
-            import asyncio
-            asyncio.run(update_project_status(
+            await update_project_status(
                 user_id=user_id,
                 task_id=task_id,
                 status="failed",
-                access_token=data.get("access_token")
-            ))
+                access_token=req.access_token
+            )
+
+def _is_text_attachment(att: dict) -> bool:
+    return att["mime"].startswith("text") or att["name"].endswith((".md", ".csv", ".json", ".txt", ".html", ".css", ".js"))
+
+async def _commit_files_rest(gh, full_name: str, branch: str, commit_files: dict, message: str, mode: str = "auto"):
+    """
+    REST fallback if the GraphQL single-commit fails.
+    Blobs are uploaded concurrently (gh bounds them by the core semaphore), then
+    committed as one tree; if any upload fails, every file is committed on its own.
+    Returns the new commit SHA, or None.
+    """
+    paths = list(commit_files)
+    results = await asyncio.gather(
+        *(create_blob(gh, full_name, commit_files[p]) for p in paths),
+        return_exceptions=True,
+    )
+    blob_shas = {}
+    for path, result in zip(paths, results):
+        if isinstance(result, Exception):
+            print(f"  ⚠ Failed to upload {path}: {result}")
+        else:
+            blob_shas[path] = result
+
+    if len(blob_shas) == len(paths):
+        try:
+            commit_sha = await commit_blobs(gh, full_name, branch, blob_shas, message)
+            print(f"✅ Batch committed {len(blob_shas)} files in a single commit to {full_name}")
+            return commit_sha
+        except Exception as e:
+            print(f"⚠ Batch commit failed: {e}")
+    else:
+        # A partial tree would silently drop files, so commit every file individually
+        print(f"⚠ {len(paths) - len(blob_shas)} of {len(paths)} blob uploads failed")
+    print("  Falling back to individual commits...")
+
+    # Contents API writes each move the branch head, so these stay sequential
+    for path, content in commit_files.items():
+        try:
+            await create_or_update_file(gh, full_name, path, content, f"Add/Update {path}", mode)
+        except Exception as e:
+            print(f"  ⚠ Failed to commit {path}: {e}")
+    try:
+        # One call for the branch head instead of a page of commits
+        return await get_branch_sha(gh, full_name, branch)
+    except Exception:
+        return None
 
 # === Background task ===
-def process_request(data):
-    round_num = data.get("round", 1)
-    task_id = data["task"]
-    github_token = data.get("github_token")  # Per-user token
-    github_username = data.get("github_username")  # Per-user username
+async def process_request(req: TaskRequest):
+    round_num = req.round
+    task_id = req.task
+    github_token = req.github_token  # Per-user token
+    github_username = req.github_username  # Per-user username
     
     print(f"⚙ Starting background process for task {task_id} (round {round_num})")
     print(f"👤 Using GitHub account: {github_username}")
 
     # Decode attachments (supports both 'url' and 'content')
-    attachments = data.get("attachments", [])
-    saved_attachments = decode_attachments(attachments)
-    print("Attachments saved:", saved_attachments)
+    attachments = [a.model_dump(exclude_none=True) for a in req.attachments]
+    saved_attachments = await asyncio.to_thread(decode_attachments, attachments)
+    print("Attachments saved:", [(a["name"], a["size"]) for a in saved_attachments])
 
     # Step 0: Fetch previous README for round 2 context
-    repo = create_repo(task_id, description=f"Auto-generated app for task: {data['brief']}", github_token=github_token)
+    gh = github_api(app.state.gh_client, github_token, app.state.gh_sem)
+    repo = await create_repo(gh, task_id, description=f"Auto-generated app for task: {req.brief}")
+    full_name = repo["full_name"]
+    owner = repo["owner"]["login"]
     prev_readme = None
     if round_num >= 2:
         try:
-            readme = repo.get_contents("README.md")
-            prev_readme = readme.decoded_content.decode("utf-8", errors="ignore")
+            prev_readme = await get_file_text(gh, full_name, "README.md")
             print(f"📖 Loaded previous README for round {round_num} context.")
         except Exception:
             prev_readme = None
 
     # Step 1: Generate app code
-    gen = generate_app_code(
-        brief=data["brief"],
-        attachments=attachments,
-        checks=data.get("checks", []),
+    gen = await asyncio.to_thread(
+        generate_app_code,
+        brief=req.brief,
+        saved=saved_attachments,  # Decoded once above
+        checks=req.checks,
         round_num=round_num,
         prev_readme=prev_readme,
-        aipipe_token=data.get("aipipe_token")
+        aipipe_token=req.aipipe_token
     )
 
     files = gen.get("files", {})
     saved_info = gen.get("attachments", [])
 
-    # Step 2: Commit all attachments (text and binary) for every round
+    # Steps 2-4: Commit attachments (text and binary), generated app files and
+    # LICENSE in a SINGLE GraphQL commit. This prevents multiple GitHub Actions
+    # workflow triggers (and email spam) and costs one round-trip, not 2 per file.
+    commit_files = {}
     for att in saved_info:
         try:
-            with open(att["path"], "rb") as f:
-                content_bytes = f.read()
-            if att["mime"].startswith("text") or att["name"].endswith((".md", ".csv", ".json", ".txt", ".html", ".css", ".js")):
-                text = content_bytes.decode("utf-8", errors="ignore")
-                create_or_update_file(repo, att["name"], text, f"Add attachment {att['name']}")
+            content_bytes = att.get("bytes")
+            if content_bytes is None:  # Large attachment, only streamed to disk; read off the event loop
+                content_bytes = await asyncio.to_thread(Path(att["path"]).read_bytes)
+            if _is_text_attachment(att):
+                commit_files[att["name"]] = content_bytes.decode("utf-8", errors="ignore")
             else:
-                create_or_update_binary_file(repo, att["name"], content_bytes, f"Add binary {att['name']}")
-                b64 = base64.b64encode(content_bytes).decode("utf-8")
-                create_or_update_file(repo, f"attachments/{att['name']}.b64", b64, f"Backup {att['name']}.b64")
+                commit_files[att["name"]] = content_bytes
         except Exception as e:
-            print("⚠ Attachment commit failed:", e)
+            print("⚠ Attachment read failed:", e)
+    commit_files.update(files)  # Generated files (index.html, README.md, etc.)
+    commit_files["LICENSE"] = generate_mit_license(owner)
 
-    # Step 3: Commit generated app files + LICENSE in a SINGLE commit
-    # This prevents multiple GitHub Actions workflow triggers (and email spam)
-    all_files = dict(files)  # Copy generated files (index.html, README.md, etc.)
-    all_files["LICENSE"] = generate_mit_license()  # Add license to same commit
-    batch_commit_files(repo, all_files, f"Update project files (round {round_num})")
+    branch = repo.get("default_branch") or "main"
+    try:
+        commit_sha = await gql_commit(
+            gh,
+            full_name,
+            branch,
+            commit_files,
+            f"Update project files (round {round_num})",
+        )
+    except Exception as e:
+        print(f"⚠ GraphQL commit failed: {e}")
+        print("  Falling back to REST commits...")
+        commit_sha = await _commit_files_rest(
+            gh,
+            full_name,
+            branch,
+            commit_files,
+            f"Update project files (round {round_num})",
+            mode="auto" if round_num == 1 else "update",  # Round 2+ mostly overwrites existing files
+        )
 
     # Step 5: GitHub Pages enablement
     # Always set pages_url since the URL format is predictable
-    pages_url = f"https://{github_username}.github.io/{task_id}/"
+    pages_url = f"https://{owner}.github.io/{task_id}/"
     if round_num == 1:
-        pages_ok = enable_pages(task_id, branch="main", github_token=github_token, github_username=github_username)
+        pages_ok = await enable_pages(gh, full_name, branch=branch)
         if pages_ok:
             print(f"✅ Pages URL: {pages_url}")
     else:
         print(f"✅ Pages URL (existing): {pages_url}")
 
-    # Step 6: Get latest commit SHA
-    try:
-        commit_sha = repo.get_commits()[0].sha
-    except Exception:
-        commit_sha = None
-
     # Step 7: Build payload for notification/storage
     payload = {
-        "email": data["email"],
-        "task": data["task"],
+        "email": req.email,
+        "task": req.task,
         "round": round_num,
-        "nonce": data["nonce"],
-        "repo_url": repo.html_url,
+        "nonce": req.nonce,
+        "repo_url": repo["html_url"],
         "commit_sha": commit_sha,
         "pages_url": pages_url,
     }
@@ -241,16 +432,13 @@ def process_request(data):
     print(f"⏭️  Skipping evaluation server notification (disabled)")
 
     # Step 8: Save processed request to avoid duplicates
-    processed = load_processed()
-    key = f"{data['email']}::{data['task']}::round{round_num}::nonce{data['nonce']}"
-    processed[key] = payload
-    save_processed(processed)
+    await save_processed(req.key, payload)
 
     print(f"✅ Finished round {round_num} for {task_id}")
     
     # Return URLs for status tracking
     return {
-        "repo_url": repo.html_url,
+        "repo_url": repo["html_url"],
         "pages_url": pages_url
     }
 
@@ -285,7 +473,7 @@ async def test_endpoint():
 
 # === Endpoint for frontend ===
 @app.post("/deploy")
-async def deploy_project(request: Request, background_tasks: BackgroundTasks, current_user = Depends(get_current_user)):
+async def deploy_project(request: Request, current_user = Depends(get_current_user)):
     """Frontend endpoint for submitting new projects (requires authentication)"""
     print(f"📩 Deployment request from user: {current_user.id}")
     
@@ -300,7 +488,7 @@ async def deploy_project(request: Request, background_tasks: BackgroundTasks, cu
         # Parse checks if it's a JSON string
         try:
             if isinstance(checks, str) and checks.startswith('['):
-                checks_list = json.loads(checks)
+                checks_list = [str(c) for c in orjson.loads(checks)]  # TaskRequest.checks is list[str]
             else:
                 checks_list = [c.strip() for c in checks.split(',') if c.strip()] if checks else []
         except:
@@ -318,7 +506,7 @@ async def deploy_project(request: Request, background_tasks: BackgroundTasks, cu
         if not user_aipipe_token:
             # No user token — check free trial eligibility
             free_count = await get_free_usage_count(current_user.id)
-            server_token = os.getenv("AIPIPE_TOKEN")
+            server_token = settings.aipipe_token
             
             if free_count >= 1:
                 # Already used the 1 free request
@@ -347,7 +535,7 @@ async def deploy_project(request: Request, background_tasks: BackgroundTasks, cu
         
         # Create task ID from brief (this will be the repo name)
         # Use up to 6 words from the brief for a clean, readable repo name
-        words = re.sub(r'[^a-zA-Z0-9\s]', '', brief).split()
+        words = _SLUG_STRIP_RE.sub('', brief).split()
         slug_words = [w.lower() for w in words[:6]]
         sanitized_brief = "-".join(slug_words) if slug_words else ""
         # GitHub repo names max 100 chars; keep it safe at 80
@@ -355,21 +543,20 @@ async def deploy_project(request: Request, background_tasks: BackgroundTasks, cu
         task_id = sanitized_brief or f"app-{uuid.uuid4().hex[:8]}"
         
         # Prepare data for processing
-        request_data = {
-            "task": task_id,
-            "brief": brief,
-            "checks": checks_list,
-            "user_id": current_user.id,
-            "email": current_user.email,
-            "github_token": github_token,
-            "github_username": github_username,
-            "round": 1,
-            "nonce": uuid.uuid4().hex[:8],
-            "attachment": [],
-            "access_token": current_user.access_token,
-            "aipipe_token": user_aipipe_token,  # None = server fallback inside generator
-            "using_free_trial": using_free_trial,
-        }
+        request_data = TaskRequest(
+            task=task_id,
+            brief=brief,
+            checks=checks_list,
+            user_id=current_user.id,
+            email=current_user.email,
+            github_token=github_token,
+            github_username=github_username,
+            round=1,
+            nonce=uuid.uuid4().hex[:8],
+            access_token=current_user.access_token,
+            aipipe_token=user_aipipe_token,  # None = server fallback inside generator
+            using_free_trial=using_free_trial,
+        )
         
         # Store initial status
         project_status[task_id] = {
@@ -394,8 +581,8 @@ async def deploy_project(request: Request, background_tasks: BackgroundTasks, cu
             access_token=current_user.access_token
         )
         
-        # Schedule background processing
-        background_tasks.add_task(process_request_with_logging, task_id, request_data)
+        # Queue for background processing by the worker pool
+        await app.state.job_queue.put((process_request_with_logging, (task_id, request_data)))
         
         print(f"✅ Task {task_id} enqueued for processing")
         
@@ -411,35 +598,33 @@ async def deploy_project(request: Request, background_tasks: BackgroundTasks, cu
 
 # === Main endpoint ===
 @app.post("/api-endpoint")
-async def receive_request(request: Request, background_tasks: BackgroundTasks):
-    data = await request.json()
-    print("📩 Received request:", data)
+async def receive_request(req: TaskRequest):
+    print("📩 Received request:", req.model_dump(exclude={"secret", "attachments"}))
 
     # Step 0: Verify secret
-    if data.get("secret") != USER_SECRET:
+    if req.secret != settings.secret:
         print("❌ Invalid secret received.")
         return {"error": "Invalid secret"}
 
-    processed = load_processed()
-    key = f"{data['email']}::{data['task']}::round{data['round']}::nonce{data['nonce']}"
+    key = req.key
 
     # Duplicate detection
-    if key in processed:
+    prev = await get_processed(key)
+    if prev is not None:
         print(f"⚠ Duplicate request detected for {key}. Re-notifying only.")
-        prev = processed[key]
-        notify_evaluation_server(data.get("evaluation_url"), prev)
+        await asyncio.to_thread(notify_evaluation_server, req.evaluation_url, prev)  # Blocking post with retries
         return {"status": "ok", "note": "duplicate handled & re-notified"}
 
-    # Schedule background task (non-blocking)
-    background_tasks.add_task(process_request, data)
+    # Queue for the worker pool (non-blocking)
+    await app.state.job_queue.put((process_request, (req,)))
 
     # Immediate HTTP 200 acknowledgment
-    return {"status": "accepted", "note": f"processing round {data['round']} started"}
+    return {"status": "accepted", "note": f"processing round {req.round} started"}
 
 
 # === Status & Debugging Endpoints ===
 @app.get("/status/{task_id}")
-def get_task_status(task_id: str):
+async def get_task_status(task_id: str):
     """Get the status of a project deployment"""
     # If we have it in memory, return it
     if task_id in project_status:
@@ -451,20 +636,18 @@ def get_task_status(task_id: str):
     # Otherwise, try to check if the GitHub repo exists
     # This handles cases where the backend restarted after task completion
     try:
-        from github import Github, GithubException
-        import os
-        github_token = os.getenv("GITHUB_TOKEN")
-        username = os.getenv("USERCODE")
+        from gidgethub import BadRequest
+        github_token = settings.github_token
+        username = settings.github_username
         
         if github_token and username:
-            g = Github(github_token)
-            user = g.get_user()
+            gh = github_api(app.state.gh_client, github_token, app.state.gh_sem)
             
             try:
                 # Check if repo exists
-                repo = user.get_repo(task_id)
+                repo = await gh.getitem(f"/repos/{username}/{task_id}")
                 # Repo exists, so task is completed
-                github_url = repo.html_url
+                github_url = repo["html_url"]
                 pages_url = f"https://{username}.github.io/{task_id}/"
                 
                 return {
@@ -477,7 +660,7 @@ def get_task_status(task_id: str):
                     "created_at": "",
                     "error": None
                 }
-            except GithubException:
+            except BadRequest:
                 # Repo doesn't exist, might still be processing or failed
                 pass
     except Exception as e:
@@ -508,10 +691,10 @@ def get_logs():
 def get_config():
     """Check configuration (safe values only)"""
     return {
-        "github_username": os.getenv("USERCODE", "NOT SET"),
-        "github_token_set": bool(os.getenv("GITHUB_TOKEN")),
-        "openai_api_key_set": bool(os.getenv("OPENAI_API_KEY")),
-        "environment": "development" if os.getenv("DEBUG") else "production"
+        "github_username": settings.github_username or "NOT SET",
+        "github_token_set": bool(settings.github_token),
+        "openai_api_key_set": bool(settings.openai_api_key),
+        "environment": "development" if settings.debug else "production"
     }
 
 
@@ -520,4 +703,13 @@ if __name__ == "__main__":
     print("🚀 Starting FastAPI server...")
     print("📍 API available at: http://localhost:8000")
     print("📚 Documentation at: http://localhost:8000/docs")
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    import sys
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=True,
+        # libuv-based event loop + C HTTP parser; uvloop has no Windows build
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+    )
\ No newline at end of file
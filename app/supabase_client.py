@@ -1,14 +1,11 @@
 # app/supabase_client.py
-import os
 from supabase import create_client, Client
-from dotenv import load_dotenv
+from .config import settings
 from .encryption import decrypt_token
 
-load_dotenv()
-
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
-SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
+SUPABASE_URL = settings.supabase_url
+SUPABASE_ANON_KEY = settings.supabase_anon_key
+SUPABASE_SERVICE_KEY = settings.supabase_service_key
 
 # Initialize Supabase client (anon key — used for auth operations)
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)